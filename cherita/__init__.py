@@ -2,6 +2,7 @@ import os
 import click
 import logging
 import json
+import zarr
 from flask import Flask, render_template
 from flask.cli import with_appcontext
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -11,6 +12,7 @@ from flask_cors import CORS
 from config import Config
 from cherita.api import api, bp
 from cherita.extensions import cache
+from cherita.utils.json_provider import ORJSONProvider
 
 
 def create_app(test_config=None):
@@ -22,6 +24,7 @@ def create_app(test_config=None):
         static_folder="static",
         template_folder="templates",
     )
+    app.json = ORJSONProvider(app)
 
     # rewrite headers for proxy deployments
     app.wsgi_app = ProxyFix(
@@ -46,12 +49,19 @@ def create_app(test_config=None):
                 "CACHE_REDIS_HOST": app.config["REDIS_HOST"],
                 "CACHE_REDIS_PORT": app.config["REDIS_PORT"],
                 "CACHE_KEY_PREFIX": app.config["CACHE_KEY_PREFIX"],
+                "CACHE_OPTIONS": {
+                    "socket_timeout": app.config["REDIS_SOCKET_TIMEOUT"],
+                    "socket_connect_timeout": app.config["REDIS_SOCKET_TIMEOUT"],
+                },
             },
         )
     else:
         logging.warning("No REDIS_HOST provided, using NullCache")
         cache.init_app(app, config={"CACHE_TYPE": "NullCache"})
 
+    # maximum number of concurrent store requests per batch of zarr reads
+    zarr.config.set({"async.concurrency": app.config["ZARR_ASYNC_CONCURRENCY"]})
+
     CORS(app)
 
     @app.route("/")
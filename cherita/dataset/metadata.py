@@ -33,6 +33,14 @@ COL_NAME = "name"
 INDEX_NAME = "matrix_index"
 
 
+def get_dtype_name(col_series: pd.Series) -> str:
+    t = re.sub(r"[^a-zA-Z]", "", col_series.dtype.name)
+    if t == "object" and pd.api.types.infer_dtype(col_series) == "boolean":
+        # boolean categoricals with missing values are parsed as objects with NaN
+        return "bool"
+    return t
+
+
 def get_obs_col_names(adata_group: zarr.Group):
     obs_col_names = adata_group["obs"].attrs["column-order"]
     return obs_col_names
@@ -48,7 +56,7 @@ def get_obs_col_metadata(
         return None
     col_series = pd.Series(parse_data(adata_group["obs"][col]))
 
-    t = re.sub(r"[^a-zA-Z]", "", col_series.dtype.name)
+    t = get_dtype_name(col_series)
     metadata = parse_dtype[t](
         col_series, obs_params=obs_params.get(col, {}), retbins=retbins
     )
@@ -79,7 +87,7 @@ def get_obs_cols_metadata(
             continue
         col_series = pd.Series(parse_data(adata_group["obs"][col]))
 
-        t = re.sub(r"[^a-zA-Z]", "", col_series.dtype.name)
+        t = get_dtype_name(col_series)
         metadata = parse_dtype[t](
             col_series, obs_params=obs_params.get(col, {}), retbins=retbins
         )
@@ -241,8 +249,8 @@ def get_obsm_keys(adata_group: zarr.Group, filter2d: bool = True):
 
 
 def get_kde_values(data):
-    data = data[~np.isnan(data)]
-    data = data[~np.isinf(data)]
+    # drops NaN and infinite values in a single pass
+    data = data[np.isfinite(data)]
 
     if not len(data):
         return np.array([]), np.array([])
@@ -2,16 +2,21 @@ from __future__ import annotations
 from typing import Union, Literal
 import base64
 import json
+import threading
 import zarr
 import logging
 import pandas as pd
 import numpy as np
+import kaleido
 import plotly.graph_objects as go
 from plotly.colors import sample_colorscale
+from config import Config
 from cherita.utils.adata_utils import parse_data, to_categorical
 from cherita.utils.models import Marker
 from cherita.resources.errors import BadRequest, InvalidObs, InvalidVar, NotInData
 
+_kaleido_lock = threading.Lock()
+
 
 def validate_pseudospatial(adata_group: zarr.Group, mask_set: str):
     if "masks" not in adata_group["uns"] or mask_set not in adata_group["uns"]["masks"]:
@@ -23,6 +28,20 @@ def validate_pseudospatial(adata_group: zarr.Group, mask_set: str):
         raise NotInData(f"No polygons found in mask {mask_set}")
 
 
+def fig_to_image(fig: go.Figure, format: str) -> bytes:
+    """Render a figure as a static image.
+
+    If enabled with KALEIDO_SERVER, images are rendered by a persistent Kaleido
+    browser started on first use instead of launching one per image. The server
+    renders one figure at a time so calls to it are serialized.
+    """
+    if not Config.KALEIDO_SERVER:
+        return fig.to_image(format=format)
+    with _kaleido_lock:
+        kaleido.start_sync_server(silence_warnings=True)
+        return fig.to_image(format=format)
+
+
 def validate_format(format: str):
     if format not in ["png", "svg", "html", "json"]:
         raise BadRequest(
@@ -460,7 +479,7 @@ def plot_polygons(
     )
 
     if plot_format in ["png", "svg"]:
-        img_bytes = fig.to_image(format=plot_format)
+        img_bytes = fig_to_image(fig, plot_format)
         img_str = base64.b64encode(img_bytes).decode()
         return img_str
     elif plot_format == "html":
@@ -1,7 +1,6 @@
-import json
 import logging
 
-from flask import Response, jsonify, request, stream_with_context
+from flask import Response, current_app, jsonify, request, stream_with_context
 from flask_restx import Namespace, Resource, fields
 
 from cherita.dataset.matrix import get_var_x_mean
@@ -21,6 +20,7 @@ from cherita.extensions import cache
 from cherita.resources.errors import BadRequest
 from cherita.utils.adata_utils import open_anndata_zarr
 from cherita.utils.caching import make_cache_key
+from cherita.utils.request_utils import decode_obs_indices
 
 ns = Namespace("dataset", description="Dataset related data", path="/")
 
@@ -142,10 +142,9 @@ class ObsCols(Resource):
                     cache_key = make_cache_key(
                         request_data={"body": col_request_body}, chunk=col
                     )
-                    cached_metadata = cache.get(cache_key)
-                    if cached_metadata:
-                        col_metadata = cached_metadata
-                    else:
+                    # chunks are cached serialized, so hits are streamed as is
+                    col_chunk = cache.get(cache_key)
+                    if not col_chunk:
                         try:
                             col_metadata = get_obs_col_metadata(
                                 adata_group,
@@ -157,16 +156,20 @@ class ObsCols(Resource):
                             logging.error(f"Failed to read obs column {col}: {e}")
                             col_metadata = None
 
-                        if col_metadata:
-                            cache.set(cache_key, col_metadata, timeout=timeout)
-                    # @TODO: optimize or create separate endpoint
-                    if col_metadata and not return_values:
-                        col_metadata.pop("values", None)
-                    if not col_metadata:
-                        continue
+                        if not col_metadata:
+                            continue
+                        # @TODO: optimize or create separate endpoint
+                        if not return_values:
+                            col_metadata.pop("values", None)
+                        # the cache key includes returnValues, and keys are
+                        # kept in category order rather than sorted
+                        col_chunk = current_app.json.dumps(
+                            col_metadata, sort_keys=False
+                        )
+                        cache.set(cache_key, col_chunk, timeout=timeout)
                     if not first:
                         yield ","
-                    yield json.dumps(col_metadata)
+                    yield col_chunk
                     first = False
                 yield "]"
 
@@ -342,6 +345,12 @@ var_histograms_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
     },
 )
 
@@ -355,7 +364,7 @@ class VarHistograms(Resource):
     @ns.expect(var_histograms_model)
     @cache.cached(make_cache_key=make_cache_key, timeout=3600 * 24 * 7)
     def post(self):
-        json_data = request.get_json()
+        json_data = decode_obs_indices(request.get_json())
         try:
             adata_group = open_anndata_zarr(json_data["url"])
             var_key = json_data["varKey"]
@@ -374,6 +383,12 @@ obs_histograms_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
     },
 )
 
@@ -387,7 +402,7 @@ class ObsHistograms(Resource):
     @ns.expect(obs_histograms_model)
     @cache.cached(make_cache_key=make_cache_key, timeout=3600 * 24 * 7)
     def post(self):
-        json_data = request.get_json()
+        json_data = decode_obs_indices(request.get_json())
         try:
             adata_group = open_anndata_zarr(json_data["url"])
             var_key = json_data["varKey"]
@@ -420,7 +435,7 @@ class MatrixMean(Resource):
     @ns.expect(matrix_mean_model)
     @cache.cached(make_cache_key=make_cache_key, timeout=3600 * 24 * 7)
     def post(self):
-        json_data = request.get_json()
+        json_data = decode_obs_indices(request.get_json())
         try:
             adata_group = open_anndata_zarr(json_data["url"])
             var_keys = json_data["varKeys"]
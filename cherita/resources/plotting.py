@@ -1,10 +1,13 @@
+import json
+from typing import Callable
 from flask import request, jsonify, Response
 from flask_restx import Resource, fields, Namespace
 from cherita.resources.errors import BadRequest
 
 from cherita.extensions import cache
 from cherita.utils.adata_utils import open_anndata_zarr
-from cherita.utils.caching import make_cache_key
+from cherita.utils.caching import make_cache_key, make_etag, etag_conditional
+from cherita.utils.request_utils import decode_obs_indices
 from cherita.plotting.heatmap import heatmap
 from cherita.plotting.dotplot import dotplot
 from cherita.plotting.matrixplot import matrixplot
@@ -18,6 +21,165 @@ from cherita.plotting.pseudospatial import (
 
 ns = Namespace("plotting", description="Plotting operations", path="/")
 
+# Sentinel to tell absent optional parameters apart from explicit nulls
+_MISSING = object()
+
+# (function kwarg, request JSON key) pairs of required parameters per endpoint
+PSEUDOSPATIAL_GENE_REQUIRED_PARAMS = (("var_key", "varKey"),)
+PSEUDOSPATIAL_CATEGORICAL_REQUIRED_PARAMS = (("obs_col", "obsCol"),)
+PSEUDOSPATIAL_CONTINUOUS_REQUIRED_PARAMS = (("obs_col", "obsCol"),)
+PSEUDOSPATIAL_MASKS_REQUIRED_PARAMS = ()
+
+# (function kwarg, request JSON key) pairs of optional parameters per endpoint
+HEATMAP_PARAMS = (
+    ("obs_values", "obsValues"),
+    ("var_names_col", "varNamesCol"),
+    ("obs_indices", "obsIndices"),
+)
+
+DOTPLOT_PARAMS = (
+    ("obs_values", "obsValues"),
+    ("mean_only_expressed", "meanOnlyExpressed"),
+    ("expression_cutoff", "expressionCutoff"),
+    ("standard_scale", "standardScale"),
+    ("var_names_col", "varNamesCol"),
+    ("obs_indices", "obsIndices"),
+)
+
+MATRIXPLOT_PARAMS = (
+    ("obs_values", "obsValues"),
+    ("standard_scale", "standardScale"),
+    ("var_names_col", "varNamesCol"),
+    ("obs_indices", "obsIndices"),
+)
+
+VIOLIN_PARAMS = (
+    ("scale", "scale"),
+    ("var_names_col", "varNamesCol"),
+)
+
+VIOLIN_MODE_PARAMS = {
+    "multikey": (
+        ("var_keys", "varKeys"),
+        ("obs_keys", "obsKeys"),
+    ),
+    "groupby": (
+        ("obs_values", "obsValues"),
+        ("obs_indices", "obsIndices"),
+    ),
+}
+
+PSEUDOSPATIAL_GENE_PARAMS = (
+    ("mask_set", "maskSet"),
+    ("mask_values", "maskValues"),
+    ("var_names_col", "varNamesCol"),
+    ("obs_col", "obsCol"),
+    ("obs_values", "obsValues"),
+    ("colormap", "colormap"),
+    ("full_html", "fullHtml"),
+    ("show_colorbar", "showColorbar"),
+    ("min_value", "minValue"),
+    ("max_value", "maxValue"),
+    ("width", "width"),
+    ("height", "height"),
+    ("obs_indices", "obsIndices"),
+)
+
+PSEUDOSPATIAL_CATEGORICAL_PARAMS = (
+    ("obs_values", "obsValues"),
+    ("mask_set", "maskSet"),
+    ("mode", "mode"),
+    ("mask_values", "maskValues"),
+    ("colormap", "colormap"),
+    ("full_html", "fullHtml"),
+    ("show_colorbar", "showColorbar"),
+    ("min_value", "minValue"),
+    ("max_value", "maxValue"),
+    ("width", "width"),
+    ("height", "height"),
+    ("obs_indices", "obsIndices"),
+)
+
+PSEUDOSPATIAL_CONTINUOUS_PARAMS = (
+    ("obs_values", "obsValues"),
+    ("mask_set", "maskSet"),
+    ("mask_values", "maskValues"),
+    ("colormap", "colormap"),
+    ("full_html", "fullHtml"),
+    ("show_colorbar", "showColorbar"),
+    ("min_value", "minValue"),
+    ("max_value", "maxValue"),
+    ("width", "width"),
+    ("height", "height"),
+    ("obs_indices", "obsIndices"),
+)
+
+PSEUDOSPATIAL_MASKS_PARAMS = (
+    ("mask_set", "maskSet"),
+    ("full_html", "fullHtml"),
+    ("width", "width"),
+    ("height", "height"),
+)
+
+
+def get_optional_params(json_data: dict, params: tuple) -> dict:
+    """Map the optional parameters present in a request body to their kwargs."""
+    return {
+        p: v for p, n in params if (v := json_data.get(n, _MISSING)) is not _MISSING
+    }
+
+
+def pseudospatial_response(
+    plot_func: Callable,
+    json_data: dict,
+    required_params: tuple,
+    optional_params: tuple,
+) -> Response:
+    """Generate a pseudospatial plot from a request body as a response.
+
+    HTML plots are returned as documents, JSON plots and base64 encoded png/svg
+    images as JSON.
+    """
+    json_data = decode_obs_indices(json_data)
+    try:
+        adata_group = open_anndata_zarr(json_data["url"])
+        plot_format = json_data.get("format", "png")
+        plot = plot_func(
+            adata_group,
+            plot_format=plot_format,
+            **{p: json_data[n] for p, n in required_params},
+            **get_optional_params(json_data, optional_params),
+        )
+    except KeyError as e:
+        raise BadRequest(f"Missing required parameter: {e}")
+
+    if plot_format == "html":
+        return Response(plot, mimetype="text/html")
+    return jsonify(plot)
+
+
+# Query string parameters of GET endpoints that take multiple values
+QUERY_LIST_PARAMS = {"maskValues": str, "obsValues": str, "obsIndices": int}
+# Query string parameters of GET endpoints that take JSON encoded objects
+QUERY_JSON_PARAMS = ("obsCol",)
+
+
+def parse_query_args(args) -> dict:
+    """Build the equivalent of a POST request body from a query string."""
+    json_data = {}
+    for key in args:
+        try:
+            if key in QUERY_LIST_PARAMS:
+                json_data[key] = list(map(QUERY_LIST_PARAMS[key], args.getlist(key)))
+            elif key in QUERY_JSON_PARAMS:
+                json_data[key] = json.loads(args[key])
+            else:
+                json_data[key] = args[key]
+        except ValueError:
+            raise BadRequest(f"Invalid value for parameter: '{key}'")
+    return json_data
+
+
 heatmap_model = ns.model(
     "HeatmapModel",
     {
@@ -33,6 +195,12 @@ heatmap_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
     },
 )
 
@@ -52,7 +220,7 @@ class Heatmap(Resource):
     )
     @ns.expect(heatmap_model)
     def post(self):
-        json_data = request.get_json()
+        json_data = decode_obs_indices(request.get_json())
         try:
             adata_group = open_anndata_zarr(json_data["url"])
             return jsonify(
@@ -60,9 +228,7 @@ class Heatmap(Resource):
                     adata_group=adata_group,
                     var_keys=json_data["varKeys"],
                     obs_col=json_data["obsCol"],
-                    obs_values=json_data.get("obsValues"),
-                    var_names_col=json_data.get("varNamesCol"),
-                    obs_indices=json_data.get("obsIndices"),
+                    **get_optional_params(json_data, HEATMAP_PARAMS),
                 )
             )
         except KeyError as e:
@@ -87,6 +253,12 @@ dotplot_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
     },
 )
 
@@ -102,7 +274,7 @@ class Dotplot(Resource):
     )
     @ns.expect(dotplot_model)
     def post(self):
-        json_data = request.get_json()
+        json_data = decode_obs_indices(request.get_json())
         try:
             adata_group = open_anndata_zarr(json_data["url"])
             return jsonify(
@@ -110,12 +282,7 @@ class Dotplot(Resource):
                     adata_group=adata_group,
                     var_keys=json_data["varKeys"],
                     obs_col=json_data["obsCol"],
-                    obs_values=json_data.get("obsValues"),
-                    mean_only_expressed=json_data.get("meanOnlyExpressed", False),
-                    expression_cutoff=json_data.get("expressionCutoff", 0.0),
-                    standard_scale=json_data.get("standardScale"),
-                    var_names_col=json_data.get("varNamesCol"),
-                    obs_indices=json_data.get("obsIndices"),
+                    **get_optional_params(json_data, DOTPLOT_PARAMS),
                 )
             )
         except KeyError as e:
@@ -138,6 +305,12 @@ matrixplot_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
     },
 )
 
@@ -153,7 +326,7 @@ class Matrixplot(Resource):
     )
     @ns.expect(matrixplot_model)
     def post(self):
-        json_data = request.get_json()
+        json_data = decode_obs_indices(request.get_json())
         try:
             adata_group = open_anndata_zarr(json_data["url"])
             return jsonify(
@@ -161,16 +334,106 @@ class Matrixplot(Resource):
                     adata_group=adata_group,
                     var_keys=json_data["varKeys"],
                     obs_col=json_data["obsCol"],
-                    obs_values=json_data.get("obsValues"),
-                    standard_scale=json_data.get("standardScale"),
-                    var_names_col=json_data.get("varNamesCol"),
-                    obs_indices=json_data.get("obsIndices"),
+                    **get_optional_params(json_data, MATRIXPLOT_PARAMS),
                 )
             )
         except KeyError as e:
             raise BadRequest(f"Missing required parameter: {e}")
 
 
+# plot functions that can be requested together, with their optional parameters
+BATCH_PLOTS = {
+    "heatmap": (heatmap, HEATMAP_PARAMS),
+    "dotplot": (dotplot, DOTPLOT_PARAMS),
+    "matrixplot": (matrixplot, MATRIXPLOT_PARAMS),
+}
+
+plot_batch_model = ns.model(
+    "PlotBatchModel",
+    {
+        "url": fields.String(required=True, description="URL to the AnnData-Zarr file"),
+        "plots": fields.List(
+            fields.Raw,
+            required=True,
+            description=(
+                "List of plots to generate. Each plot requires a `type`"
+                " ('heatmap', 'dotplot' or 'matrixplot') and takes the parameters"
+                " of its endpoint, plus an optional `id` to key its result."
+                " Defaults to the `type`, so plots of the same type need an `id`"
+            ),
+        ),
+        "varKeys": fields.List(
+            fields.String, description="List of selected markers shared by all plots"
+        ),
+        "obsCol": fields.Raw(description="Selected obs column shared by all plots"),
+        "obsValues": fields.List(
+            fields.String, description="Selected obs values shared by all plots"
+        ),
+        "varNamesCol": fields.String(description="Var names column"),
+        "obsIndices": fields.List(
+            fields.Integer, description="List of observation indices"
+        ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
+    },
+)
+
+
+@ns.route("/plot/batch")
+class PlotBatch(Resource):
+    @ns.doc(
+        description=(
+            "Generate multiple plots from the same AnnData object in one request."
+            " Parameters set outside `plots` are shared by all plots"
+        ),
+        responses={200: "Success", 400: "Bad request", 500: "Internal server error"},
+    )
+    @ns.expect(plot_batch_model)
+    def post(self):
+        json_data = request.get_json()
+        try:
+            adata_group = open_anndata_zarr(json_data["url"])
+            shared_data = {
+                k: v for k, v in json_data.items() if k not in ("url", "plots")
+            }
+            plots = json_data["plots"]
+            if not isinstance(plots, list) or not all(
+                isinstance(plot, dict) for plot in plots
+            ):
+                raise BadRequest("`plots` must be a list of objects")
+            results = {}
+            for plot in plots:
+                plot_data = decode_obs_indices({**shared_data, **plot})
+                plot_type = plot_data["type"]
+                if not isinstance(plot_type, str) or plot_type not in BATCH_PLOTS:
+                    raise BadRequest(
+                        f"Invalid plot type '{plot_type}'. "
+                        f"Must be one of {', '.join(BATCH_PLOTS)}"
+                    )
+                plot_id = plot_data.get("id", plot_type)
+                if not isinstance(plot_id, str):
+                    raise BadRequest("Plot `id` must be a string")
+                if plot_id in results:
+                    raise BadRequest(
+                        f"Duplicate plot id '{plot_id}'. "
+                        "Set a unique `id` for plots of the same type"
+                    )
+                plot_func, plot_params = BATCH_PLOTS[plot_type]
+                results[plot_id] = plot_func(
+                    adata_group=adata_group,
+                    var_keys=plot_data["varKeys"],
+                    obs_col=plot_data["obsCol"],
+                    **get_optional_params(plot_data, plot_params),
+                )
+            return jsonify(results)
+        except KeyError as e:
+            raise BadRequest(f"Missing required parameter: {e}")
+
+
 violin_model = ns.model(
     "ViolinModel",
     {
@@ -200,6 +463,12 @@ groupby_violin_model = ns.inherit(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
     },
 )
 
@@ -215,33 +484,20 @@ class Violin(Resource):
     )
     @ns.expect(violin_model)
     def post(self):
-        json_data = request.get_json()
+        json_data = decode_obs_indices(request.get_json())
         try:
             adata_group = open_anndata_zarr(json_data["url"])
             mode = json_data["mode"]
-            if mode == "multikey":
-                ns.expect(multikey_violin_model)
-                params = dict(
-                    var_keys=json_data.get("varKeys", []),
-                    obs_keys=json_data.get("obsKeys", []),
-                )
-            elif mode == "groupby":
-                ns.expect(groupby_violin_model)
-                params = dict(
-                    var_key=json_data["varKey"],
-                    obs_col=json_data["obsCol"],
-                    obs_values=json_data.get("obsValues"),
-                    obs_indices=json_data.get("obsIndices"),
-                )
-            return jsonify(
-                violin(
-                    adata_group=adata_group,
-                    mode=mode,
-                    scale=json_data.get("scale", "width"),
-                    var_names_col=json_data.get("varNamesCol"),
-                    **params,
+            if mode not in VIOLIN_MODE_PARAMS:
+                raise BadRequest(
+                    f"Invalid mode '{mode}'. Must be one of 'groupby', 'multikey'"
                 )
+            params = get_optional_params(
+                json_data, VIOLIN_PARAMS + VIOLIN_MODE_PARAMS[mode]
             )
+            if mode == "groupby":
+                params.update(var_key=json_data["varKey"], obs_col=json_data["obsCol"])
+            return jsonify(violin(adata_group=adata_group, mode=mode, **params))
         except KeyError as e:
             raise BadRequest(f"Missing required parameter: {e}")
 
@@ -283,6 +539,12 @@ pseudospatial_gene_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
         "colormap": fields.String(description="Colormap name"),
         "fullHtml": fields.Boolean(
             description=(
@@ -316,49 +578,39 @@ class PseudospatialGene(Resource):
     @ns.expect(pseudospatial_gene_model)
     @cache.cached(make_cache_key=make_cache_key, timeout=3600 * 24 * 7)
     def post(self):
-        json_data = request.get_json()
-        try:
-            adata_group = open_anndata_zarr(json_data["url"])
-            var_key = json_data["varKey"]
-            plot_format = json_data.get("format", "png")
-            optional_params = dict(
-                mask_set="maskSet",
-                mask_values="maskValues",
-                var_names_col="varNamesCol",
-                obs_col="obsCol",
-                obs_values="obsValues",
-                colormap="colormap",
-                full_html="fullHtml",
-                show_colorbar="showColorbar",
-                min_value="minValue",
-                max_value="maxValue",
-                width="width",
-                height="height",
-                obs_indices="obsIndices",
-            )
-            optional_params_dict = {
-                p: json_data.get(n)
-                for p, n in optional_params.items()
-                if n in json_data
-            }
+        return self.plot(request.get_json())
 
-            plot = pseudospatial_gene(
-                adata_group,
-                var_key=var_key,
-                plot_format=plot_format,
-                **optional_params_dict,
-            )
+    @ns.doc(
+        description=(
+            "Generate a pseudospatial plot for the given gene in the AnnData object."
+            " Takes the same parameters as POST in the query string, repeating"
+            " list parameters and JSON encoding `obsCol`."
+            " Responses carry an ETag for conditional requests"
+        ),
+        params={
+            "url": "URL to the AnnData-Zarr file",
+            "varKey": "Var key to plot, e.g. gene name or gene symbol",
+        },
+        responses={
+            200: "Success",
+            304: "Not modified",
+            400: "Bad request",
+            500: "Internal server error",
+            404: "Not found",
+        },
+    )
+    @etag_conditional
+    @cache.cached(make_cache_key=make_etag, timeout=3600 * 24 * 7)
+    def get(self):
+        return self.plot(parse_query_args(request.args))
 
-            if plot_format == "html":
-                return Response(
-                    plot,
-                    mimetype="text/html",
-                )
-            elif plot_format == "json":
-                return jsonify(plot)
-            return plot
-        except KeyError as e:
-            raise BadRequest(f"Missing required parameter: {e}")
+    def plot(self, json_data: dict):
+        return pseudospatial_response(
+            pseudospatial_gene,
+            json_data,
+            PSEUDOSPATIAL_GENE_REQUIRED_PARAMS,
+            PSEUDOSPATIAL_GENE_PARAMS,
+        )
 
 
 pseudospatial_categorical_model = ns.model(
@@ -383,6 +635,12 @@ pseudospatial_categorical_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
         "colormap": fields.String(description="Colormap"),
         "fullHtml": fields.Boolean(description="Full HTML"),
         "showColorbar": fields.Boolean(description="Show colorbar"),
@@ -411,49 +669,12 @@ class PseudospatialCategorical(Resource):
     @ns.expect(pseudospatial_categorical_model)
     @cache.cached(make_cache_key=make_cache_key, timeout=3600 * 24 * 7)
     def post(self):
-        json_data = request.get_json()
-        try:
-            adata_group = open_anndata_zarr(json_data["url"])
-            obs_col = json_data["obsCol"]
-            plot_format = json_data.get("format", "png")
-
-            optional_params = dict(
-                obs_values="obsValues",
-                mask_set="maskSet",
-                mode="mode",
-                mask_values="maskValues",
-                colormap="colormap",
-                full_html="fullHtml",
-                show_colorbar="showColorbar",
-                min_value="minValue",
-                max_value="maxValue",
-                width="width",
-                height="height",
-                obs_indices="obsIndices",
-            )
-            optional_params_dict = {
-                p: json_data.get(n)
-                for p, n in optional_params.items()
-                if n in json_data
-            }
-
-            plot = pseudospatial_categorical(
-                adata_group,
-                obs_col,
-                plot_format=plot_format,
-                **optional_params_dict,
-            )
-
-            if plot_format == "html":
-                return Response(
-                    plot,
-                    mimetype="text/html",
-                )
-            elif plot_format == "json":
-                return jsonify(plot)
-            return plot
-        except KeyError as e:
-            raise BadRequest(f"Missing required parameter: {e}")
+        return pseudospatial_response(
+            pseudospatial_categorical,
+            request.get_json(),
+            PSEUDOSPATIAL_CATEGORICAL_REQUIRED_PARAMS,
+            PSEUDOSPATIAL_CATEGORICAL_PARAMS,
+        )
 
 
 pseudospatial_continuous_model = ns.model(
@@ -472,6 +693,12 @@ pseudospatial_continuous_model = ns.model(
         "obsIndices": fields.List(
             fields.Integer, description="List of observation indices"
         ),
+        "obsIndicesB64": fields.String(
+            description=(
+                "Observation indices as a base64 encoded little-endian int32 array."
+                " Takes precedence over `obsIndices`"
+            )
+        ),
         "colormap": fields.String(description="Colormap"),
         "fullHtml": fields.Boolean(description="Full HTML"),
         "showColorbar": fields.Boolean(description="Show colorbar"),
@@ -500,48 +727,12 @@ class PseudospatialContinuous(Resource):
     @ns.expect(pseudospatial_continuous_model)
     @cache.cached(make_cache_key=make_cache_key, timeout=3600 * 24 * 7)
     def post(self):
-        json_data = request.get_json()
-        try:
-            adata_group = open_anndata_zarr(json_data["url"])
-            obs_col = json_data["obsCol"]
-            plot_format = json_data.get("format", "png")
-
-            optional_params = dict(
-                obs_values="obsValues",
-                mask_set="maskSet",
-                mask_values="maskValues",
-                colormap="colormap",
-                full_html="fullHtml",
-                show_colorbar="showColorbar",
-                min_value="minValue",
-                max_value="maxValue",
-                width="width",
-                height="height",
-                obs_indices="obsIndices",
-            )
-            optional_params_dict = {
-                p: json_data.get(n)
-                for p, n in optional_params.items()
-                if n in json_data
-            }
-
-            plot = pseudospatial_continuous(
-                adata_group,
-                obs_col,
-                plot_format=plot_format,
-                **optional_params_dict,
-            )
-
-            if plot_format == "html":
-                return Response(
-                    plot,
-                    mimetype="text/html",
-                )
-            elif plot_format == "json":
-                return jsonify(plot)
-            return plot
-        except KeyError as e:
-            raise BadRequest(f"Missing required parameter: {e}")
+        return pseudospatial_response(
+            pseudospatial_continuous,
+            request.get_json(),
+            PSEUDOSPATIAL_CONTINUOUS_REQUIRED_PARAMS,
+            PSEUDOSPATIAL_CONTINUOUS_PARAMS,
+        )
 
 
 pseudospatial_masks_model = ns.model(
@@ -574,36 +765,9 @@ class PseudospatialMasks(Resource):
     @ns.expect(pseudospatial_masks_model)
     @cache.cached(make_cache_key=make_cache_key, timeout=3600 * 24 * 7)
     def post(self):
-        json_data = request.get_json()
-        try:
-            adata_group = open_anndata_zarr(json_data["url"])
-            plot_format = json_data.get("format", "png")
-
-            optional_params = {
-                "mask_set": "maskSet",
-                "full_html": "fullHtml",
-                "width": "width",
-                "height": "height",
-            }
-            optional_params_dict = {
-                p: json_data.get(n)
-                for p, n in optional_params.items()
-                if n in json_data
-            }
-
-            plot = pseudospatial_masks(
-                adata_group,
-                plot_format=plot_format,
-                **optional_params_dict,
-            )
-
-            if plot_format == "html":
-                return Response(
-                    plot,
-                    mimetype="text/html",
-                )
-            elif plot_format == "json":
-                return jsonify(plot)
-            return plot
-        except KeyError as e:
-            raise BadRequest(f"Missing required parameter: {e}")
+        return pseudospatial_response(
+            pseudospatial_masks,
+            request.get_json(),
+            PSEUDOSPATIAL_MASKS_REQUIRED_PARAMS,
+            PSEUDOSPATIAL_MASKS_PARAMS,
+        )
@@ -1,41 +1,161 @@
 from __future__ import annotations
-import os
+import posixpath
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
 import zarr
 import numpy as np
 import pandas as pd
-from zarr.errors import GroupNotFoundError
+import orjson
+from zarr.abc.store import ByteRequest, Store
+from zarr.core.buffer import Buffer, BufferPrototype
+from zarr.core.sync import sync
+from zarr.experimental.cache_store import CacheStore
+from zarr.storage import FsspecStore, LocalStore, MemoryStore
 from typing import Union
 from urllib.parse import urlparse, ParseResult
 
+from config import Config
 from cherita.resources.errors import ReadZarrError, InvalidKey
 
+BOOL_CATEGORIES = {"True", "False"}
+DTYPE_KIND_TO_PYTHON = {"i": int, "u": int, "f": float, "b": bool}
+
+_MISSING = object()
+
+
+class ParsedDataCache:
+    """Thread-safe LRU cache of parsed zarr arrays and groups.
+
+    Entries are keyed by their store's identity and their path, and keep a
+    reference to the store so that identity is not reused while cached.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, data: Union[zarr.Group, zarr.Array]):
+        key = (id(data.store), data.path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not data.store:
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, data: Union[zarr.Group, zarr.Array], value):
+        key = (id(data.store), data.path)
+        with self._lock:
+            self._entries[key] = (data.store, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_store(self, store: Store):
+        """Remove the entries of a store, releasing the store and its values."""
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if v[0] is store]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# parsed columns shared across requests
+_parsed_data_cache = ParsedDataCache(Config.PARSED_DATA_CACHE_SIZE)
+# indices of parsed columns, keeping the hashtables built for lookups
+_lookup_index_cache = ParsedDataCache(Config.PARSED_DATA_CACHE_SIZE)
+# signatures of the metadata of opened datasets
+_signature_cache = ParsedDataCache(Config.ZARR_STORE_CACHE_SIZE)
+
 
 def get_group_index(group: zarr.Group):
-    if "_index" in group.attrs:
-        return group[group.attrs["_index"]]
-    else:
-        return group["_index"]
+    return group[get_group_index_name(group)]
 
 
 def get_group_index_name(group: zarr.Group):
-    if "_index" in group.attrs:
-        return group.attrs["_index"]
-    else:
-        return "_index"
+    return group.attrs.get("_index", "_index")
 
 
-def get_index_in_array(array: zarr.Array, item: str):
-    try:
-        return np.where(array[:] == item)[0][0]
-    except Exception:
-        raise InvalidKey(f"Invalid key: {item}")
+def get_lookup_index(array: Union[zarr.Array, np.ndarray]) -> pd.Index:
+    """Get a pandas Index of an array's values to look up positions in.
+
+    The Index of a zarr array is cached across requests, so the hashtable
+    pandas builds on the first lookup is reused by later ones.
+
+    Args:
+        array (Union[zarr.Array, np.ndarray]): Array to look up values in.
 
+    Returns:
+        pd.Index: Index of the array's values.
+    """
+    if not isinstance(array, zarr.Array):
+        return pd.Index(array)
+    index = _lookup_index_cache.get(array)
+    if index is _MISSING:
+        index = pd.Index(parse_data(array), copy=False)
+        _lookup_index_cache.set(array, index)
+    return index
 
-def get_indices_in_array(array: zarr.Array, items: list[str]):
-    if not set(items).issubset(array[:]):
-        raise InvalidKey(f"Invalid keys: {items}")
-    sorter = np.argsort(array[:])
-    return sorter[np.searchsorted(array[:], items, sorter=sorter)]
+
+def get_index_in_array(array: Union[zarr.Array, np.ndarray], item: str):
+    try:
+        loc = get_lookup_index(array).get_loc(item)
+    except (KeyError, TypeError, pd.errors.InvalidIndexError):
+        raise InvalidKey(f"Invalid key: {item}")
+    # duplicated values give a slice or a mask, match the first occurrence
+    if isinstance(loc, slice):
+        loc = loc.start
+    elif isinstance(loc, np.ndarray):
+        loc = loc.argmax()
+    # zarr reads numpy integers as scalars rather than 0-d arrays
+    return np.intp(loc)
+
+
+def get_indices_in_array(array: Union[zarr.Array, np.ndarray], items: list[str]):
+    index = get_lookup_index(array)
+    items = np.asarray(items)
+    if index.is_unique:
+        indices = index.get_indexer(items)
+    else:
+        # match the first occurrence of duplicated values
+        first = ~index.duplicated()
+        indices = index[first].get_indexer(items)
+        indices = np.where(indices < 0, -1, np.flatnonzero(first)[indices])
+    invalid = indices < 0
+    if invalid.any():
+        raise InvalidKey(f"Invalid keys: {items[invalid].tolist()}")
+    return indices
+
+
+def get_contiguous_slices(indices: list[int], size: int) -> list[slice] | None:
+    """Split strictly increasing indices into slices of contiguous runs.
+
+    Args:
+        indices (list[int]): Indices to split.
+        size (int): Length of the indexed axis.
+
+    Returns:
+        list[slice] | None: Slices covering the indices, or None if the indices
+            are not strictly increasing or not within [0, size), as slices
+            would not wrap negative indices nor raise for out of bounds ones.
+    """
+    indices = np.asarray(indices)
+    if indices[0] < 0 or indices[-1] >= size:
+        return None
+    steps = np.diff(indices)
+    if (steps <= 0).any():
+        return None
+    breaks = np.flatnonzero(steps != 1) + 1
+    starts = indices[np.concatenate(([0], breaks))]
+    stops = indices[np.concatenate((breaks - 1, [len(indices) - 1]))] + 1
+    return [slice(int(start), int(stop)) for start, stop in zip(starts, stops)]
 
 
 def get_category_at_index(group: zarr.Group, index: int):
@@ -50,75 +170,212 @@ def get_category_at_index(group: zarr.Group, index: int):
         )
 
 
+async def _read_arrays(arrays: list[zarr.Array], selection) -> list[np.ndarray]:
+    return await asyncio.gather(*(a.async_array.getitem(selection) for a in arrays))
+
+
+def read_arrays(arrays: list[zarr.Array], selection=slice(None)) -> list[np.ndarray]:
+    """Read zarr arrays, fetching all of their chunks concurrently.
+
+    Args:
+        arrays (list[zarr.Array]): Arrays to read.
+        selection (optional): Selection to read from each array.
+            Defaults to the full arrays.
+
+    Returns:
+        list[np.ndarray]: The arrays' values, in the same order.
+    """
+    return sync(_read_arrays(arrays, selection))
+
+
 def parse_data(data: Union[zarr.Group, zarr.Array], store: zarr.Group = None):
+    value = _parsed_data_cache.get(data)
+    if value is not _MISSING:
+        return value
     try:
         if isinstance(data, zarr.Group):
-            return parse_group(data)
+            value = parse_group(data)
         elif isinstance(data, zarr.Array):
-            return parse_array(data, store)
+            value = parse_array(data, store)
+        else:
+            return None
     except KeyError as e:
         raise InvalidKey(f"Invalid key: {e}")
+    cache_parsed_data(data, value)
+    return value
+
+
+def cache_parsed_data(data: Union[zarr.Group, zarr.Array], value):
+    # only cache columns, as dataframes and dicts are mutable
+    if isinstance(value, np.ndarray):
+        # shared across requests so guard it against modification
+        value.setflags(write=False)
+        _parsed_data_cache.set(data, value)
+    elif isinstance(value, pd.Categorical):
+        _parsed_data_cache.set(data, value)
+
+
+def parse_dataframe(group: zarr.Group) -> pd.DataFrame:
+    index_name = get_group_index_name(group)
+    names = [
+        name
+        for name in group.array_keys()
+        if not name.startswith("_") and name != index_name
+    ] + list(group.group_keys())
+    # the parsed index is cached, so share its values instead of copying
+    index = pd.Index(parse_data(group[index_name]), copy=False)
+    return pd.DataFrame(parse_group_columns(group, names), index=index, copy=False)
+
+
+def parse_categorical(group: zarr.Group) -> Union[pd.Categorical, np.ndarray]:
+    if is_categorical_group(group):
+        codes, categories = read_arrays([group["codes"], group["categories"]])
+        return categorical_from_codes(codes, categories)
+    else:
+        raise ReadZarrError(
+            f"Categorical group {group} does not contain 'codes' and 'categories'"
+        )
+
+
+def is_categorical_group(group: zarr.Group) -> bool:
+    return "codes" in group and "categories" in group
+
+
+def categorical_from_codes(
+    codes: np.ndarray, categories: np.ndarray
+) -> Union[pd.Categorical, np.ndarray]:
+    # codes written by anndata are in range, skip checking every one
+    series = pd.Categorical.from_codes(codes, categories=categories, validate=False)
+    if is_bool_categorical(series):
+        return categorical_to_bool(series)
+    return series
+
+
+def parse_dict(group: zarr.Group) -> dict:
+    # members lists the children's metadata once instead of a lookup per key
+    members = dict(group.members())
+    # read the plain arrays concurrently, then parse the remaining members
+    array_names = [
+        k
+        for k, member in members.items()
+        if isinstance(member, zarr.Array)
+        and member.ndim
+        and "categories" not in member.attrs
+    ]
+    arrays = dict(zip(array_names, read_arrays([members[k] for k in array_names])))
+    return {
+        k: arrays[k] if k in arrays else parse_data(member)
+        for k, member in members.items()
+    }
+
+
+GROUP_PARSERS = {
+    "dataframe": parse_dataframe,
+    "categorical": parse_categorical,
+    "dict": parse_dict,
+}
 
 
 def parse_group(group: zarr.Group):
     encoding_type = group.attrs.get("encoding-type", "")
-    if encoding_type == "dataframe":
-        if "_index" in group.attrs:
-            df = pd.DataFrame(index=group[group.attrs["_index"]])
-        for name in [
-            name
-            for name in group.array_keys()
-            if not name.startswith("_") and name != get_group_index_name(group)
-        ]:
-            df[name] = group[name]
-        for name in group.group_keys():
-            df[name] = parse_group(group[name])
-        return df
-    elif encoding_type == "categorical":
-        if "codes" in group and "categories" in group:
-            series = pd.Categorical.from_codes(
-                group["codes"][:], categories=group["categories"][:]
-            )
-            if np.array_equal(
-                np.sort(series.categories.values), np.sort(["True", "False"])
-            ):
-                return series.map(
-                    {"True": True, "False": False}, na_action="ignore"
-                ).astype(bool)
-            return series
-        else:
-            raise ReadZarrError(
-                f"Categorical group {group} does not contain 'codes' and 'categories'"
-            )
-    elif encoding_type == "dict":
-        d = {}
-        for k in group.keys():
-            d[k] = parse_data(group[k])
-        return d
-    else:
+    try:
+        parser = GROUP_PARSERS[encoding_type]
+    except KeyError:
         raise ReadZarrError(f"Unrecognized encoding-type {encoding_type}")
+    return parser(group)
+
+
+def is_bool_categorical(series: pd.Categorical) -> bool:
+    categories = series.categories
+    if categories.dtype == bool:
+        # written from a boolean categorical, no need to check the values
+        return True
+    return len(categories) == 2 and set(categories) == BOOL_CATEGORIES
+
+
+def categorical_to_bool(series: pd.Categorical) -> np.ndarray:
+    """Convert a categorical of booleans or "True" and "False" strings to booleans.
+
+    Missing values are kept as NaN, in which case an object array is returned.
+    """
+    categories = series.categories
+    true_value = True if categories.dtype == bool else "True"
+    codes = series.codes
+    values = np.isin(codes, np.flatnonzero(categories == true_value))
+    if codes.min(initial=0) < 0:
+        values = values.astype(object)
+        values[codes < 0] = np.nan
+    return values
+
+
+def parse_group_columns(group: zarr.Group, names: list[str]) -> dict:
+    """Parse columns of a dataframe group without building a DataFrame.
+
+    Args:
+        group (zarr.Group): Dataframe group, e.g. obs or var.
+        names (list[str]): Names of the columns to parse.
+
+    Returns:
+        dict: Parsed column values keyed by name, in the same order as `names`.
+    """
+    members = {name: group[name] for name in names}
+    columns = {}
+    for name, member in members.items():
+        value = _parsed_data_cache.get(member)
+        if value is not _MISSING:
+            columns[name] = value
+    missing = [name for name in names if name not in columns]
+    array_names = [name for name in missing if isinstance(members[name], zarr.Array)]
+    categorical_names = [
+        name
+        for name in missing
+        if isinstance(members[name], zarr.Group)
+        and members[name].attrs.get("encoding-type") == "categorical"
+        and is_categorical_group(members[name])
+    ]
+    group_names = [
+        name
+        for name in missing
+        if name not in array_names and name not in categorical_names
+    ]
+    # each column is read with its own requests, so read them concurrently,
+    # along with the codes and categories of the categorical columns
+    values = read_arrays(
+        [members[name] for name in array_names]
+        + [
+            members[name][key]
+            for name in categorical_names
+            for key in ["codes", "categories"]
+        ]
+    )
+    parsed = dict(zip(array_names, values))
+    codes, categories = values[len(array_names) :: 2], values[len(array_names) + 1 :: 2]
+    for name, c, cats in zip(categorical_names, codes, categories):
+        parsed[name] = categorical_from_codes(c, cats)
+    # other groups may contain dataframes or dicts, so parse them in turn
+    for name in group_names:
+        parsed[name] = parse_group(members[name])
+    for name, value in parsed.items():
+        cache_parsed_data(members[name], value)
+        columns[name] = value
+    return {name: columns[name] for name in names}
 
 
 def parse_array(array: zarr.Array, store: zarr.Group = None):
     if "categories" in array.attrs:
-        series = pd.Categorical.from_codes(
-            array[:],
-            categories=store[
-                os.path.join(os.path.dirname(array.path), array.attrs["categories"])
-            ],
+        # zarr keys are always separated by forward slashes
+        categories_path = posixpath.join(
+            posixpath.dirname(array.path), array.attrs["categories"]
         )
-        if np.array_equal(
-            np.sort(series.categories.values), np.sort(["True", "False"])
-        ):
-            return series.map({"True": True, "False": False}).astype(bool)
-        return series
+        codes, categories = read_arrays([array, store[categories_path]])
+        return categorical_from_codes(codes, categories)
     else:
         return array[:]
 
 
 def get_row_from_zarr_df(group: zarr.Group, idx: str, cols: list):
     df_idx = get_index_in_array(get_group_index(group), idx)
-    return {c: group[c][df_idx] for c in cols}
+    return dict(zip(cols, read_arrays([group[c] for c in cols], df_idx)))
 
 
 def get_s3_http_options(o: ParseResult):
@@ -128,10 +385,36 @@ def get_s3_http_options(o: ParseResult):
     return s3url, storage_options
 
 
-def open_anndata_zarr(url: str):
+class ChunkCacheStore(CacheStore):
+    """In-memory LRU cache over a read-only store.
+
+    Only whole-key reads are cached, partial reads (e.g. from shards) are passed
+    through to the underlying store.
+    """
+
+    async def get(
+        self,
+        key: str,
+        prototype: BufferPrototype,
+        byte_range: ByteRequest | None = None,
+    ) -> Buffer | None:
+        if byte_range is not None:
+            return await self._store.get(key, prototype, byte_range)
+        return await super().get(key, prototype)
+
+
+def get_store(url: str) -> Store:
+    """Get a read-only store for the given URL.
+
+    Remote stores are wrapped with an in-memory cache so repeated reads of
+    metadata and chunks of the same dataset are served from memory. Local
+    stores are read directly, as the OS already caches their files.
+    """
     o = urlparse(url)
 
-    if o.scheme in ["gcs", "gs"]:
+    if o.scheme in ["", "file"]:
+        return LocalStore(o.path if o.scheme else url, read_only=True)
+    elif o.scheme in ["gcs", "gs"]:
         storage_options = {"token": "anon"}
     elif o.netloc == "storage.googleapis.com":
         storage_options = None
@@ -141,21 +424,123 @@ def open_anndata_zarr(url: str):
         except Exception:
             url, storage_options = url, None
 
+    store = FsspecStore.from_url(url, storage_options=storage_options, read_only=True)
+
+    return ChunkCacheStore(
+        store, cache_store=MemoryStore(), max_size=Config.ZARR_CHUNK_CACHE_SIZE
+    )
+
+
+def _open_anndata_zarr_uncached(url: str):
+    store = get_store(url)
+
     try:
-        adata_group = zarr.open_consolidated(
-            url, storage_options=storage_options, mode="r"
-        )
-    except (FileNotFoundError, KeyError, ValueError):
-        try:
-            adata_group = zarr.open_group(
-                url, storage_options=storage_options, mode="r"
-            )
-        except GroupNotFoundError:
-            raise ReadZarrError(f"Cannot open Anndata Zarr at URL {url}")
+        # uses consolidated metadata if present, read along with the root metadata
+        adata_group = zarr.open_group(store, mode="r", use_consolidated=None)
+    except FileNotFoundError:
+        raise ReadZarrError(f"Cannot open Anndata Zarr at URL {url}")
+
+    if adata_group.metadata.consolidated_metadata is None:
+        # each group and array will be read with its own request
+        logging.warning(f"No consolidated metadata found for {url}")
+
+    return adata_group
+
+
+# groups are only read from so they are shared across requests, along with
+# their stores and the stores' caches, keyed by URL with the time they were opened
+_opened_groups = OrderedDict()
+_opened_groups_lock = threading.Lock()
+
+
+def _discard_group(adata_group: zarr.Group):
+    # release the data parsed from the group so its store can be freed
+    _parsed_data_cache.discard_store(adata_group.store)
+    _lookup_index_cache.discard_store(adata_group.store)
+    _signature_cache.discard_store(adata_group.store)
+
 
+def open_anndata_zarr(url: str) -> zarr.Group:
+    """Open an AnnData-Zarr store, reusing the group opened by earlier requests.
+
+    If ZARR_STORE_CACHE_TTL is set, the group is reopened once it is older
+    than the TTL so changes to the dataset are picked up. Groups that are
+    reopened or evicted are released along with the data parsed from them.
+
+    Args:
+        url (str): URL or path of the AnnData-Zarr store.
+
+    Returns:
+        zarr.Group: The store's root group.
+    """
+    ttl = Config.ZARR_STORE_CACHE_TTL
+    now = time.monotonic()
+    with _opened_groups_lock:
+        entry = _opened_groups.get(url)
+        if entry is not None and not (ttl > 0 and now - entry[0] > ttl):
+            _opened_groups.move_to_end(url)
+            return entry[1]
+
+    adata_group = _open_anndata_zarr_uncached(url)
+
+    with _opened_groups_lock:
+        expired = _opened_groups.pop(url, None)
+        expired = [expired[1]] if expired is not None else []
+        _opened_groups[url] = (now, adata_group)
+        while len(_opened_groups) > Config.ZARR_STORE_CACHE_SIZE:
+            expired.append(_opened_groups.popitem(last=False)[1][1])
+    for group in expired:
+        _discard_group(group)
     return adata_group
 
 
+def clear_caches():
+    """Clear the cached stores, groups and parsed data of all datasets."""
+    with _opened_groups_lock:
+        _opened_groups.clear()
+    _parsed_data_cache.clear()
+    _lookup_index_cache.clear()
+    _signature_cache.clear()
+
+
+def get_dataset_signature(url: str) -> str:
+    """Get a hash of an AnnData-Zarr store's metadata, as read when it was opened.
+
+    The signature changes when the dataset is rewritten with different
+    columns, shapes or chunks, once it is reopened (see ZARR_STORE_CACHE_TTL).
+    Changes to the values alone are not reflected. Without consolidated
+    metadata only the root, obs, var and X metadata are hashed, so changes to
+    other groups or to the arrays of obs and var columns are not reflected.
+
+    Args:
+        url (str): URL or path of the AnnData-Zarr store.
+
+    Returns:
+        str: Hex digest of the store's metadata, including consolidated
+            metadata if present.
+    """
+    adata_group = open_anndata_zarr(url)
+    signature = _signature_cache.get(adata_group)
+    if signature is _MISSING:
+        metadata = {"root": adata_group.metadata.to_dict()}
+        if adata_group.metadata.consolidated_metadata is None:
+            # the root metadata holds no nodes, so read the ones that are
+            # plotted, whose attributes list the obs and var columns
+            for key in ["obs", "var", "X"]:
+                if key in adata_group:
+                    metadata[key] = adata_group[key].metadata.to_dict()
+        metadata = orjson.dumps(
+            metadata,
+            default=str,
+            option=orjson.OPT_SERIALIZE_NUMPY
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SORT_KEYS,
+        )
+        signature = hashlib.blake2b(metadata, digest_size=16).hexdigest()
+        _signature_cache.set(adata_group, signature)
+    return signature
+
+
 def get_undefined_category_name(series):
     base_name = "undefined"
     if base_name not in series.cat.categories:
@@ -170,18 +555,37 @@ def get_undefined_category_name(series):
 def fillna_as_undefined(obs):
     if obs.hasnans:
         undefined_cat = get_undefined_category_name(obs)
-        # Add undefined category at end of categories, code will be len(categories)+1
-        obs = obs.cat.add_categories(undefined_cat)
-        obs.fillna(undefined_cat, inplace=True)
-        return obs, undefined_cat
+        # Add undefined category at end of categories, code will be len(categories)
+        categories = obs.cat.categories
+        codes = obs.cat.codes.to_numpy()
+        # reassign the missing codes directly instead of a pandas-level fillna
+        filled = pd.Categorical.from_codes(
+            np.where(codes < 0, len(categories), codes),
+            categories=categories.append(pd.Index([undefined_cat])),
+            ordered=obs.cat.ordered,
+            validate=False,
+        )
+        return pd.Series(filled, index=obs.index, name=obs.name), undefined_cat
     return obs, None
 
 
 def type_category(obs, **kwargs):
-    obs, undefined_cat = fillna_as_undefined(obs)
-    categories = [str(i) for i in obs.cat.categories.values.tolist()]
-    codes = {str(i): idx for idx, i in enumerate(categories)}
-    value_counts = {}
+    categories = obs.cat.categories
+    if categories.inferred_type == "string":
+        # already strings, avoid calling str on each category
+        categories = categories.tolist()
+    else:
+        categories = [str(i) for i in categories.values.tolist()]
+    # count each category and missing values in a single pass over the codes
+    counts = np.bincount(obs.cat.codes.to_numpy() + 1, minlength=len(categories) + 1)
+    undefined_cat = None
+    if counts[0]:
+        undefined_cat = get_undefined_category_name(obs)
+        categories.append(undefined_cat)
+        counts = np.roll(counts, -1)
+    else:
+        counts = counts[1:]
+    codes = dict(zip(categories, range(len(categories))))
 
     if undefined_cat:
         # -1 code for undefined category for frontend to match zarr data
@@ -189,16 +593,18 @@ def type_category(obs, **kwargs):
         # so it doesn't matter if the code is -1 in frontend
         codes.update({undefined_cat: -1})
 
+    # sorted by descending count, breaking ties as value_counts does
+    order = np.arange(len(counts))[::-1][counts[::-1].argsort()][::-1]
+
     return {
         "type": "categorical",
         "values": categories,
         "n_values": len(categories),
         "codes": codes,
         "codesMap": {str(v): k for k, v in codes.items()},
-        "value_counts": {
-            **value_counts,
-            **{str(k): v for k, v in obs.value_counts().to_dict().items()},
-        },
+        "value_counts": dict(
+            zip(np.array(categories, dtype=object)[order], counts[order].tolist())
+        ),
     }
 
 
@@ -223,11 +629,9 @@ def type_numeric(obs, obs_params: dict = {}, retbins: bool = True, **kwargs):
     return {
         **cat_obs,
         "type": "continuous",
-        "min": encode_dtype(ndarray_min(obs)),
-        "max": encode_dtype(ndarray_max(obs)),
-        "mean": encode_dtype(ndarray_mean(obs)),
-        "median": encode_dtype(ndarray_median(obs)),
-        "n_unique": np.unique(obs).size,
+        **{k: encode_dtype(v) for k, v in ndarray_stats(obs).items()},
+        # hashes the values instead of sorting them
+        "n_unique": pd.unique(np.asarray(obs)).size,
     }
 
 
@@ -239,47 +643,42 @@ def type_discrete(obs, **kwargs):
     return data
 
 
-def ndarray_max(a):
-    if np.isnan(a).all():
-        return 0
-    else:
-        return np.nanmax(a)
-
+def drop_nan(a):
+    """Return the array's values without NaN, as a copy for float arrays."""
+    a = np.asarray(a)
+    if a.dtype.kind == "f":
+        return a[~np.isnan(a)]
+    return a
 
-def ndarray_min(a):
-    if np.isnan(a).all():
-        return 0
-    else:
-        return np.nanmin(a)
 
+def median(a):
+    # np.median selects the middle values with a partition rather than a sort,
+    # which can reuse the array if drop_nan already copied it
+    return np.median(a, overwrite_input=a.dtype.kind == "f")
 
-def ndarray_mean(a):
-    if np.isnan(a).all():
-        return 0
-    else:
-        return np.nanmean(a)
 
+def ndarray_stats(a) -> dict:
+    """Compute the min, max, mean and median of an array ignoring NaN.
 
-def ndarray_median(a):
-    if np.isnan(a).all():
-        return 0
-    else:
-        return np.nanmedian(a)
+    NaN values are dropped once for all four statistics, which are 0 if the
+    array is empty or all NaN.
+    """
+    a = drop_nan(a)
+    if not a.size:
+        return {"min": 0, "max": 0, "mean": 0, "median": 0}
+    stats = {"min": a.min(), "max": a.max(), "mean": a.mean()}
+    # partitioning reorders the values so it runs last
+    stats["median"] = median(a)
+    return stats
 
 
 def encode_dtype(a):
-    if hasattr(a, "dtype"):
-        if isinstance(a, np.integer):
-            return int(a)
-        if isinstance(a, np.floating):
-            return float(a)
-        if isinstance(a, np.bool_):
-            return bool(a)
-        if isinstance(a, np.ndarray) or isinstance(a, pd.Categorical):
-            return a.tolist()
-        return a
-    else:
-        return a
+    if isinstance(a, np.generic):
+        to_python = DTYPE_KIND_TO_PYTHON.get(a.dtype.kind)
+        return to_python(a) if to_python else a
+    if isinstance(a, (np.ndarray, pd.Categorical)):
+        return a.tolist()
+    return a
 
 
 # @TODO: get type from AnnData
@@ -340,6 +739,80 @@ def get_bin_data(s: pd.Series, thresholds=None, nBins: int = 5):
     )
 
 
+def count_unique(values: Union[pd.Series, np.ndarray], limit: int) -> int:
+    """Count the unique values, ignoring NaN, stopping once over a limit.
+
+    Values are hashed in blocks of growing size so that columns with many
+    unique values, such as continuous ones, stop after their first block.
+
+    Args:
+        values (Union[pd.Series, np.ndarray]): Values to count.
+        limit (int): Number of unique values to stop counting after.
+
+    Returns:
+        int: Number of unique values, or a number over the limit if there are
+            more than the limit.
+    """
+    values = np.asarray(values)
+    uniques = values[:0]
+    start, block_size = 0, 8192
+    while start < len(values):
+        block = values[start : start + block_size]
+        uniques = pd.unique(np.concatenate([uniques, block]))
+        n_unique = len(uniques) - int(pd.isna(uniques).any())
+        if n_unique > limit:
+            return n_unique
+        start += block_size
+        block_size *= 2
+    return len(uniques) - int(pd.isna(uniques).any())
+
+
+def get_bin_codes(values: np.ndarray, thresholds: list) -> np.ndarray:
+    """Find the bin of each value as pd.cut with include_lowest=True would.
+
+    Bins are closed on the right, with the first bin also including its left
+    edge.
+
+    Args:
+        values (np.ndarray): Values to bin.
+        thresholds (list): Strictly increasing bin edges.
+
+    Returns:
+        np.ndarray: Bin of each value, -1 for missing values and values
+            outside the thresholds.
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    if (np.diff(thresholds) <= 0).any():
+        raise ValueError("bins must increase monotonically.")
+    ids = np.searchsorted(thresholds, values, side="left")
+    ids[values == thresholds[0]] = 1
+    # NaN sorts after every edge, so it is outside the thresholds too
+    ids[ids == len(thresholds)] = 0
+    return ids - 1
+
+
+def bins_to_categorical(bin_codes: np.ndarray, n_bins: int) -> pd.Categorical:
+    """Build a categorical of the bins that contain values from their codes.
+
+    Args:
+        bin_codes (np.ndarray): Bin of each value, -1 for missing values.
+        n_bins (int): Number of bins.
+
+    Returns:
+        pd.Categorical: Categorical with the observed bins' numbers as categories.
+    """
+    valid = bin_codes >= 0
+    observed = np.bincount(bin_codes[valid], minlength=n_bins) > 0
+    # renumber the codes to skip empty bins
+    bin_to_code = np.cumsum(observed) - 1
+    codes = np.where(valid, bin_to_code[bin_codes], -1)
+    return pd.Categorical.from_codes(
+        codes,
+        categories=pd.Index(np.flatnonzero(observed), dtype="Int64"),
+        validate=False,
+    )
+
+
 def continuous2categorical(
     array: np.Array,
     thresholds: list[Union[int, float]] = None,
@@ -349,31 +822,30 @@ def continuous2categorical(
 ):
     s = pd.Series(array)
     bin_data = get_bin_data(s, thresholds=thresholds, nBins=nBins)
-    s_cat = s.astype("category")
-    s_cat = s_cat.cat.as_ordered()
-    if bin_data["nBins"] >= len(s_cat.cat.categories):
-        bin_data = get_bin_data(s_cat, nBins=len(s_cat.cat.categories))
+    # count unique values without building a categorical that binning discards
+    n_unique = count_unique(s, limit=bin_data["nBins"])
+    if bin_data["nBins"] >= n_unique:
+        s_cat = s.astype("category").cat.as_ordered()
+        bin_data = get_bin_data(s_cat, nBins=n_unique)
         if fillna:
             s_cat, _ = fillna_as_undefined(s_cat)
         s_bin_cat = pd.Categorical(s_cat)
         return s_bin_cat, bin_data
     else:
-        s_cut = (
-            pd.cut(s_cat, bin_data["thresholds"], include_lowest=True, labels=False)
-            .astype("Int64")
-            .astype("category")
-        )
+        bin_codes = get_bin_codes(s.to_numpy(), bin_data["thresholds"])
+        s_bin_cat = bins_to_categorical(bin_codes, bin_data["nBins"])
         if fillna:
-            s_cut, _ = fillna_as_undefined(s_cut)
-        s_bin_cat = pd.Categorical(s_cut)
+            s_cut, _ = fillna_as_undefined(pd.Series(s_bin_cat))
+            s_bin_cat = pd.Categorical(s_cut)
         return s_bin_cat, bin_data
 
 
 def discrete2categorical(
     array: np.Array, nBins: int = 5, fillna: bool = True, **kwargs
 ):
-    s = pd.Series(array).astype("category")
-    if nBins >= len(s.cat.categories):
+    s = pd.Series(array)
+    if nBins >= count_unique(s, limit=nBins):
+        s = s.astype("category")
         if fillna:
             s, _ = fillna_as_undefined(s)
         return pd.Categorical(s), None
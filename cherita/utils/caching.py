@@ -1,11 +1,16 @@
+import functools
 import hashlib
-import json
+import orjson
 import redis
 import logging
+import threading
+import time
 
-from flask import request
+from flask import request, current_app, make_response, Response
 from flask_caching.backends.rediscache import RedisCache
 
+from cherita.utils.adata_utils import get_dataset_signature
+
 
 def make_cache_key(*args, request_data: dict = {}, chunk: str = None, **kwargs) -> str:
     data = {
@@ -13,54 +18,143 @@ def make_cache_key(*args, request_data: dict = {}, chunk: str = None, **kwargs)
         "path": request.path,
         "body": request_data.get("body", request.get_json(silent=True) or {}),
     }
+    if request.args:
+        data["args"] = request.args.to_dict(flat=False)
     if chunk:
         data["chunk"] = chunk
-    data_str = json.dumps(data, sort_keys=True)
-    return hashlib.md5(data_str.encode("utf-8")).hexdigest()
+    return hash_data(data)
+
+
+def make_etag(*args, **kwargs) -> str:
+    data = {
+        "version": current_app.config.get("API_VERSION"),
+        "path": request.path,
+        "args": request.args.to_dict(flat=False),
+    }
+    url = request.args.get("url")
+    if url:
+        # so responses are revalidated when the dataset is rewritten
+        data["dataset"] = get_dataset_signature(url)
+    return hash_data(data)
+
+
+def hash_data(data: dict) -> str:
+    # orjson sorts keys and returns bytes in C, and blake2b is faster than md5
+    data_bytes = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(data_bytes, digest_size=16).hexdigest()
+
+
+def etag_conditional(f):
+    """Decorator for GET views whose response is a pure function of the
+    request path, query string and the metadata of the dataset at `url`.
+
+    Sets an ETag computed from the request parameters and the dataset's
+    signature and answers matching conditional requests with a 304 Not
+    Modified without calling the view. Views that are also cached should use
+    `make_etag` as their cache key so the cached response matches the ETag.
+    """
+
+    @functools.wraps(f)
+    def decorated(*args, **kwargs):
+        etag = make_etag()
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+    return decorated
 
 
 class SafeRedisCache(RedisCache):
+    """RedisCache that treats Redis being unreachable as a cache miss.
+
+    After ``FAIL_MAX`` consecutive connection errors or timeouts the cache
+    stops contacting Redis for ``RESET_TIMEOUT`` seconds, so requests made
+    during an outage do not each wait for the connection to time out. After
+    that a single call is let through to check whether Redis is back while
+    concurrent calls keep returning their default, and the circuit closes if
+    it succeeds or opens again if it fails.
+    """
+
+    FAIL_MAX = 5
+    RESET_TIMEOUT = 30
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
     def _log_connection_error(self, e):
-        logging.error("Redis connection error", e)
+        logging.error("Redis connection error: %s", e)
 
-    def get(self, *args, **kwargs):
+    def _circuit_state(self) -> str:
+        """Return "closed" to call Redis, "open" to skip it, or "half-open"
+        if this call is the single probe after the reset timeout."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if (
+                self._probing
+                or time.monotonic() - self._opened_at < self.RESET_TIMEOUT
+            ):
+                return "open"
+            self._probing = True
+            return "half-open"
+
+    def _record_failure(self, e, probe: bool = False):
+        with self._lock:
+            self._failures += 1
+            if probe:
+                self._probing = False
+            if probe or self._failures >= self.FAIL_MAX:
+                if self._opened_at is None:
+                    logging.warning(
+                        "Skipping Redis for %s seconds after %s connection errors",
+                        self.RESET_TIMEOUT,
+                        self._failures,
+                    )
+                self._opened_at = time.monotonic()
+        self._log_connection_error(e)
+
+    def _record_success(self, probe: bool = False):
+        with self._lock:
+            self._failures = 0
+            if probe:
+                self._probing = False
+                self._opened_at = None
+
+    def _call(self, method, default, *args, **kwargs):
+        state = self._circuit_state()
+        if state == "open":
+            return default
+        probe = state == "half-open"
         try:
-            return super().get(*args, **kwargs)
-        except redis.ConnectionError as e:
-            self._log_connection_error(e)
-            return None
+            result = method(*args, **kwargs)
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            self._record_failure(e, probe=probe)
+            return default
+        if probe or self._failures:
+            self._record_success(probe=probe)
+        return result
+
+    def get(self, *args, **kwargs):
+        return self._call(super().get, None, *args, **kwargs)
 
     def set(self, *args, **kwargs):
-        try:
-            return super().set(*args, **kwargs)
-        except redis.ConnectionError as e:
-            self._log_connection_error(e)
-            return False
+        return self._call(super().set, False, *args, **kwargs)
 
     def delete(self, *args, **kwargs):
-        try:
-            return super().delete(*args, **kwargs)
-        except redis.ConnectionError as e:
-            self._log_connection_error(e)
-            return False
+        return self._call(super().delete, False, *args, **kwargs)
 
     def clear(self):
-        try:
-            return super().clear()
-        except redis.ConnectionError as e:
-            self._log_connection_error(e)
-            return False
+        return self._call(super().clear, False)
 
-    def inc(self):
-        try:
-            return super().inc()
-        except redis.ConnectionError as e:
-            self._log_connection_error(e)
-            return False
+    def inc(self, *args, **kwargs):
+        return self._call(super().inc, False, *args, **kwargs)
 
-    def dec(self):
-        try:
-            return super().dec()
-        except redis.ConnectionError as e:
-            self._log_connection_error(e)
-            return False
+    def dec(self, *args, **kwargs):
+        return self._call(super().dec, False, *args, **kwargs)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+import typing as t
+import orjson
+
+from flask.json.provider import DefaultJSONProvider
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Parses request bodies and serializes responses in C, writing response
+    bodies as bytes directly. NumPy arrays and scalars are serialized natively
+    and non-string keys are converted to strings as with the standard library.
+    """
+
+    def _dumps(
+        self, obj: t.Any, option: int = 0, sort_keys: bool | None = None
+    ) -> bytes:
+        option |= orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        sort_keys = kwargs.pop("sort_keys", None)
+        if kwargs:
+            # orjson does not take other json.dumps arguments
+            if sort_keys is not None:
+                kwargs["sort_keys"] = sort_keys
+            return super().dumps(obj, **kwargs)
+        return self._dumps(obj, sort_keys=sort_keys).decode()
+
+    def loads(self, s: str | bytes, **kwargs: t.Any) -> t.Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            self._dumps(obj, option), mimetype=self.mimetype
+        )
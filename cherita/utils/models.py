@@ -6,6 +6,8 @@ from typing import Union, Callable
 from cherita.utils.adata_utils import (
     get_group_index,
     get_index_in_array,
+    get_indices_in_array,
+    get_contiguous_slices,
     parse_data,
     get_category_at_index,
 )
@@ -14,6 +16,10 @@ from cherita.resources.errors import (
     InvalidVar,
 )
 
+# Max number of contiguous runs of obs indices to read as separate slices
+# instead of a single selection with an array of indices
+MAX_OBS_SLICES = 16
+
 
 @dataclass
 class Marker:
@@ -88,14 +94,8 @@ class Marker:
         Raises:
             InvalidVar: If the index is invalid.
         """
-        var_index = get_group_index(adata_group["var"])
-        if isinstance(var_index, zarr.Group):
-            raise InvalidVar(
-                (
-                    "Expected var index to be an array, got group. "
-                    "This can be due to var index being categorical."
-                )
-            )
+        var_group = adata_group["var"]
+        var_index = cls._get_var_index(adata_group)
         if isinstance(index, int):
             matrix_index = index
             try:
@@ -112,20 +112,14 @@ class Marker:
             raise InvalidVar(f"Invalid feature type {type(index)}")
 
         if var_names_col:
-            if isinstance(adata_group["var"][var_names_col], zarr.Array):
-                var_name = adata_group["var"][var_names_col][matrix_index]
+            var_names = var_group[var_names_col]
+            if isinstance(var_names, zarr.Array):
+                var_name = var_names[matrix_index]
             else:
-                if (
-                    adata_group["var"][var_names_col].attrs.get("encoding-type", "")
-                    == "categorical"
-                ):
-                    var_name = get_category_at_index(
-                        adata_group["var"][var_names_col], matrix_index
-                    )
+                if var_names.attrs.get("encoding-type", "") == "categorical":
+                    var_name = get_category_at_index(var_names, matrix_index)
                 else:
-                    var_name = parse_data(adata_group["var"][var_names_col])[
-                        matrix_index
-                    ]
+                    var_name = parse_data(var_names)[matrix_index]
         else:
             var_name = index
 
@@ -160,15 +154,61 @@ class Marker:
         Returns:
             Marker: An instance of the Marker class.
         """
-        name = varset["name"]
-        markers = [
-            Marker.from_index(adata_group, i, var_names_col) for i in varset["indices"]
-        ]
+        return cls.from_indices(
+            adata_group, varset["indices"], varset["name"], aggregation_func
+        )
+
+    @classmethod
+    def from_indices(
+        cls,
+        adata_group: zarr.Group,
+        indices: list[Union[int, str]],
+        name: str,
+        aggregation_func: Callable[[np.ndarray]] = lambda x: np.mean(x, axis=0),
+    ) -> Marker:
+        """
+        Create a set Marker instance from multiple indices, resolving them at once.
+
+        Args:
+            adata_group (zarr.Group): The zarr group containing the data.
+            indices (list[Union[int, str]]): The indices or names of the vars.
+            name (str): The name of the set.
+            aggregation_func (Callable[[np.ndarray]], optional): The aggregation
+                function to apply to the data. Defaults to np.mean.
+
+        Returns:
+            Marker: An instance of the Marker class.
+
+        Raises:
+            InvalidVar: If any of the indices is invalid.
+        """
+        var_index = cls._get_var_index(adata_group)
+        var_values = parse_data(var_index)
+        for i in indices:
+            if not isinstance(i, (int, str)):
+                raise InvalidVar(f"Invalid feature type {type(i)}")
+        items = np.array(indices, dtype=object)
+        is_name = np.array([isinstance(i, str) for i in indices], dtype=bool)
+        matrix_index = np.zeros(len(items), dtype=np.intp)
+        if is_name.any():
+            try:
+                matrix_index[is_name] = get_indices_in_array(
+                    var_index, items[is_name].tolist()
+                )
+            except InvalidKey as e:
+                raise InvalidVar(f"Invalid feature indices. {e.message}")
+        if not is_name.all():
+            positions = items[~is_name].astype(np.intp)
+            invalid = (positions < -len(var_values)) | (positions >= len(var_values))
+            if invalid.any():
+                raise InvalidVar(f"Invalid feature index {positions[invalid][0]}")
+            matrix_index[~is_name] = positions
+            items[~is_name] = var_values[positions]
 
         marker_instance = cls(
-            index=[m.index for m in markers],
+            index=items.tolist(),
             name=name,
-            matrix_index=[m.matrix_index for m in markers],
+            matrix_index=matrix_index.tolist(),
             isSet=True,
             adata_group=adata_group,
         )
@@ -176,6 +216,18 @@ class Marker:
 
         return marker_instance
 
+    @staticmethod
+    def _get_var_index(adata_group: zarr.Group) -> zarr.Array:
+        var_index = get_group_index(adata_group["var"])
+        if isinstance(var_index, zarr.Group):
+            raise InvalidVar(
+                (
+                    "Expected var index to be an array, got group. "
+                    "This can be due to var index being categorical."
+                )
+            )
+        return var_index
+
     def get_X_at(self, indices: list[int] = None) -> np.ndarray:
         """
         Get the data associated with the marker at the specified indices.
@@ -191,18 +243,26 @@ class Marker:
             return np.array([])
         if self.isSet:
             # return all data for each marker in the set instead of aggregated data
-            return np.array(
-                [
-                    self.adata_group["X"][
-                        indices if indices is not None else slice(None), i
-                    ]
-                    for i in self.matrix_index
-                ]
-            )
+            return self._get_X_column(np.asarray(self.matrix_index), indices).T
         else:
-            return self.adata_group["X"][
-                indices if indices is not None else slice(None), self.matrix_index
-            ]
+            return self._get_X_column(self.matrix_index, indices)
+
+    def _get_X_column(
+        self, matrix_index: Union[int, np.ndarray], indices: list[int] = None
+    ):
+        # an array of matrix indices reads all of the columns in a single
+        # orthogonal selection instead of one read per column
+        X = self.adata_group["X"]
+        if indices is None:
+            return X.oindex[:, matrix_index]
+        # contiguous runs of indices (e.g. from obs masks) are faster to read as
+        # slices than as a selection with an array of indices
+        slices = get_contiguous_slices(indices, X.shape[0])
+        if slices is not None and len(slices) <= MAX_OBS_SLICES:
+            if len(slices) == 1:
+                return X.oindex[slices[0], matrix_index]
+            return np.concatenate([X.oindex[s, matrix_index] for s in slices])
+        return X.oindex[np.asarray(indices), matrix_index]
 
     @property
     def X(self) -> np.ndarray:
@@ -218,7 +278,7 @@ class Marker:
                     "Aggregation function is not set for a set of markers."
                 )
             return self._aggregation_function(
-                [self.adata_group["X"][:, i] for i in self.matrix_index]
+                self._get_X_column(np.asarray(self.matrix_index)).T
             )
         else:
             return self.adata_group["X"][:, self.matrix_index]
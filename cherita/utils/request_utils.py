@@ -0,0 +1,29 @@
+import base64
+import binascii
+import numpy as np
+
+from cherita.resources.errors import BadRequest
+
+
+def decode_obs_indices(json_data: dict) -> dict:
+    """Decode compact observation indices in a request body.
+
+    Requests can send `obsIndicesB64`, a base64 encoded buffer of little-endian
+    int32 indices, instead of an `obsIndices` list. This avoids parsing large
+    selections into lists of Python ints.
+
+    Args:
+        json_data (dict): Request body.
+
+    Returns:
+        dict: The request body with `obsIndices` as a numpy array if
+            `obsIndicesB64` was set, otherwise the unchanged request body.
+    """
+    if json_data.get("obsIndicesB64") is None:
+        return json_data
+    try:
+        buffer = base64.b64decode(json_data["obsIndicesB64"], validate=True)
+        obs_indices = np.frombuffer(buffer, dtype="<i4")
+    except (binascii.Error, TypeError, ValueError):
+        raise BadRequest("Invalid obsIndicesB64, expected base64 encoded int32 array")
+    return {**json_data, "obsIndices": obs_indices}
@@ -1,15 +1,28 @@
 from __future__ import annotations
 from flask import current_app
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
 
 from cherita.resources.errors import FetchError
 
+# shared across requests so connections to strapi are kept alive and reused
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.1, allowed_methods=["GET"]),
+)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
 
 def get_from_strapi(endpoint: str, params: dict = {}):
     API_URL = current_app.config["STRAPI_API"]
 
-    response = requests.get(urljoin(API_URL, endpoint), params=params)
+    response = _session.get(urljoin(API_URL, endpoint), params=params)
     if not response:
         raise FetchError("Error fetching from strapi")
     if response.status_code != 200:
@@ -17,4 +30,4 @@ def get_from_strapi(endpoint: str, params: dict = {}):
             f"Unsuccesful status code {response.status_code} fetching from strapi"
         )
 
-    return response.json()
+    return orjson.loads(response.content)
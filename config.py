@@ -13,3 +13,11 @@ class Config(object):
     REDIS_HOST = os.environ.get("REDIS_HOST", None)
     REDIS_PORT = os.environ.get("REDIS_PORT", 6379)
     CACHE_KEY_PREFIX = os.environ.get("CACHE_KEY_PREFIX", "cherita-flask-cache_")
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 1))
+    ZARR_STORE_CACHE_SIZE = int(os.environ.get("ZARR_STORE_CACHE_SIZE", 16))
+    # seconds before an opened dataset is reopened, 0 keeps it until evicted
+    ZARR_STORE_CACHE_TTL = int(os.environ.get("ZARR_STORE_CACHE_TTL", 0))
+    ZARR_CHUNK_CACHE_SIZE = int(os.environ.get("ZARR_CHUNK_CACHE_SIZE", 64 * 1024**2))
+    PARSED_DATA_CACHE_SIZE = int(os.environ.get("PARSED_DATA_CACHE_SIZE", 64))
+    ZARR_ASYNC_CONCURRENCY = int(os.environ.get("ZARR_ASYNC_CONCURRENCY", 10))
+    KALEIDO_SERVER = os.environ.get("KALEIDO_SERVER", "false").lower() in ["true", "1"]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cherita.resources.errors import InvalidKey
+from cherita.utils.adata_utils import (
+    categorical_to_bool,
+    count_unique,
+    get_bin_codes,
+    get_contiguous_slices,
+    get_index_in_array,
+    get_indices_in_array,
+    is_bool_categorical,
+)
+
+
+def test_get_contiguous_slices():
+    assert get_contiguous_slices([1, 2, 3, 7, 8, 10], 11) == [
+        slice(1, 4),
+        slice(7, 9),
+        slice(10, 11),
+    ]
+    assert get_contiguous_slices([5], 11) == [slice(5, 6)]
+    assert get_contiguous_slices([3, 2], 11) is None
+    assert get_contiguous_slices([1, 1], 11) is None
+    # slices would not wrap negative indices nor raise for out of bounds ones
+    assert get_contiguous_slices([-3, -2, -1], 11) is None
+    assert get_contiguous_slices([-1, 0, 1], 11) is None
+    assert get_contiguous_slices([10, 11], 11) is None
+
+
+def test_get_indices_in_array():
+    for values in [["a", "b", "c", "d"], ["c", "a", "d", "b"]]:
+        array = np.array(values, dtype=object)
+        indices = get_indices_in_array(array, ["d", "a", "c"])
+        assert array[indices].tolist() == ["d", "a", "c"]
+        with pytest.raises(InvalidKey):
+            get_indices_in_array(array, ["a", "e"])
+        with pytest.raises(InvalidKey):
+            get_indices_in_array(array, ["z"])
+    array = np.array(["c", "a", "d", "a"], dtype=object)
+    assert get_indices_in_array(array, ["a", "c"]).tolist() == [1, 0]
+
+
+def test_get_index_in_array():
+    array = np.array(["c", "a", "d", "a"], dtype=object)
+    assert get_index_in_array(array, "a") == 1
+    assert get_index_in_array(array, "d") == 2
+    with pytest.raises(InvalidKey):
+        get_index_in_array(array, "e")
+
+
+def test_categorical_to_bool():
+    for values in [[True, False, True], ["True", "False", "True"]]:
+        series = pd.Categorical(values)
+        assert is_bool_categorical(series)
+        assert categorical_to_bool(series).tolist() == [True, False, True]
+    series = pd.Categorical([True, None, False])
+    assert categorical_to_bool(series)[[0, 2]].tolist() == [True, False]
+    assert np.isnan(categorical_to_bool(series)[1])
+    assert not is_bool_categorical(pd.Categorical(["True", "False", "None"]))
+
+
+def test_get_bin_codes():
+    values = np.array([-1, 0, 0.5, 1, 1.5, 2, 3, np.nan])
+    thresholds = [0, 1, 2]
+    expected = pd.cut(values, thresholds, include_lowest=True, labels=False)
+    assert (
+        get_bin_codes(values, thresholds).tolist()
+        == np.nan_to_num(expected, nan=-1).tolist()
+    )
+    with pytest.raises(ValueError):
+        get_bin_codes(values, [0, 2, 1])
+
+
+def test_count_unique():
+    values = np.array([1.0, np.nan, 2.0, 1.0, 3.0])
+    assert count_unique(values, limit=5) == 3
+    assert count_unique(values, limit=1) > 1
+    assert count_unique(np.arange(100_000), limit=10) > 10
+    assert count_unique(np.array([]), limit=0) == 0
@@ -0,0 +1,105 @@
+import json
+
+import anndata as ad
+import numpy as np
+import pandas as pd
+import pytest
+import redis
+from flask_caching.backends.rediscache import RedisCache
+
+from cherita import create_app
+from cherita.utils import caching
+from cherita.utils.adata_utils import clear_caches
+from cherita.utils.caching import SafeRedisCache, make_etag
+
+
+def test_safe_redis_cache_circuit_breaker(monkeypatch):
+    calls = []
+
+    def get(self, key):
+        calls.append(key)
+        raise redis.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(RedisCache, "get", get)
+    cache = SafeRedisCache()
+
+    for _ in range(SafeRedisCache.FAIL_MAX):
+        assert cache.get("key") is None
+    assert len(calls) == SafeRedisCache.FAIL_MAX
+
+    # open circuit, redis is not contacted
+    assert cache.get("key") is None
+    assert len(calls) == SafeRedisCache.FAIL_MAX
+
+    # one call is let through after the reset timeout and opens it again
+    now = caching.time.monotonic()
+    monkeypatch.setattr(
+        caching.time, "monotonic", lambda: now + SafeRedisCache.RESET_TIMEOUT
+    )
+    assert cache.get("key") is None
+    assert cache.get("key") is None
+    assert len(calls) == SafeRedisCache.FAIL_MAX + 1
+
+
+def test_safe_redis_cache_half_open(monkeypatch):
+    calls = []
+    probe_calls = []
+    fail = True
+
+    def get(self, key):
+        calls.append(key)
+        if fail:
+            raise redis.ConnectionError("Connection refused")
+        if key == "other":
+            return "value"
+        # calls made while the probe is in flight do not reach redis
+        probe_calls.append(cache.get("other"))
+        return "value"
+
+    monkeypatch.setattr(RedisCache, "get", get)
+    cache = SafeRedisCache()
+    for _ in range(SafeRedisCache.FAIL_MAX):
+        cache.get("key")
+
+    now = caching.time.monotonic()
+    monkeypatch.setattr(
+        caching.time, "monotonic", lambda: now + SafeRedisCache.RESET_TIMEOUT
+    )
+    fail = False
+    assert cache.get("key") == "value"
+    assert probe_calls == [None]
+    assert calls == ["key"] * (SafeRedisCache.FAIL_MAX + 1)
+
+    # a successful probe closes the circuit
+    probe_calls.clear()
+    assert cache.get("key") == "value"
+    assert probe_calls == ["value"]
+
+
+@pytest.mark.parametrize("consolidated", [True, False])
+def test_make_etag_dataset(tmp_path, consolidated):
+    url = str(tmp_path / "anndata.zarr")
+
+    def write(obs_cols):
+        obs = pd.DataFrame({col: np.arange(3) for col in obs_cols})
+        obs.index = obs.index.astype(str)
+        ad.AnnData(np.zeros((3, 1)), obs=obs).write_zarr(url)
+        if not consolidated:
+            # drop the consolidated metadata of zarr v2 and v3 stores
+            (tmp_path / "anndata.zarr" / ".zmetadata").unlink(missing_ok=True)
+            root = tmp_path / "anndata.zarr" / "zarr.json"
+            if root.exists():
+                metadata = json.loads(root.read_text())
+                metadata.pop("consolidated_metadata", None)
+                root.write_text(json.dumps(metadata))
+
+    write(["a"])
+    app = create_app({"TESTING": True})
+    with app.test_request_context("/plot", query_string={"url": url}):
+        clear_caches()
+        etag = make_etag()
+        assert make_etag() == etag
+        # reopened after the dataset is rewritten
+        write(["a", "b"])
+        clear_caches()
+        assert make_etag() != etag
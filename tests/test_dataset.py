@@ -1,3 +1,6 @@
+import gc
+import weakref
+
 import anndata as ad
 import numpy as np
 import pandas as pd
@@ -46,7 +49,8 @@ class TestClass:
             "categorical_colors": ["#ff0000", "#00ff00", "#0000ff"],
         }
 
-        adata = ad.AnnData(np.ones((N_OBS, N_VAR)), obs=obs, var=var, uns=uns)
+        X = np.arange(N_OBS * N_VAR, dtype="float64").reshape(N_OBS, N_VAR)
+        adata = ad.AnnData(X, obs=obs, var=var, uns=uns)
 
         return adata
 
@@ -101,6 +105,28 @@ class TestClass:
                 assert "-1" in metadata[col]["codesMap"]
                 assert metadata[col]["codesMap"]["-1"] == "undefined"
 
+    def test_bool_obs_col_with_nan_metadata(self, tmp_path):
+        from cherita.dataset.metadata import get_obs_col_metadata
+
+        obs = pd.DataFrame(
+            {
+                "boolean_with_nan": pd.Categorical([True, None, False, True]),
+                "string_boolean_with_nan": pd.Categorical(
+                    ["True", None, "False", "True"]
+                ),
+            },
+            index=[f"cell{i}" for i in range(4)],
+        )
+        adata = ad.AnnData(np.zeros((4, 1)), obs=obs)
+        adata.write_zarr(tmp_path / "anndata.zarr")
+
+        adata_group = zarr.open_group(tmp_path / "anndata.zarr", mode="r")
+        for col in obs.columns:
+            metadata = get_obs_col_metadata(adata_group, col)
+            assert metadata["type"] == "boolean"
+            assert metadata["codes"]["undefined"] == -1
+            assert metadata["value_counts"] == {"True": 2, "False": 1, "undefined": 1}
+
     def test_obs_bin_data(self, anndata_zarr_v2, anndata_zarr_v3):
         from cherita.dataset.metadata import get_obs_col_metadata
 
@@ -137,3 +163,208 @@ class TestClass:
             results = search_var_names(adata_group, col="id", text="gene1")
             assert len(results) == 1
             assert results[0]["name"] == "gene1"
+
+    def test_marker_get_X_at(self, adata, anndata_zarr_v2, anndata_zarr_v3):
+        from cherita.utils.models import Marker
+
+        for zarr_path in [anndata_zarr_v2, anndata_zarr_v3]:
+            adata_group = zarr.open_group(zarr_path, mode="r")
+            marker = Marker.from_any(adata_group, "3")
+            for indices in [
+                [1, 2, 3, 7, 8],
+                [5, 1, 2],
+                list(range(N_OBS)),
+                [-3, -2, -1],
+                [-1, 0, 1],
+            ]:
+                assert np.array_equal(marker.get_X_at(indices), adata.X[indices, 3])
+            with pytest.raises(IndexError):
+                marker.get_X_at([N_OBS, N_OBS + 1])
+
+    def test_marker_from_varset(self, adata, anndata_zarr_v2, anndata_zarr_v3):
+        from cherita.resources.errors import InvalidVar
+        from cherita.utils.models import Marker
+
+        for zarr_path in [anndata_zarr_v2, anndata_zarr_v3]:
+            adata_group = zarr.open_group(zarr_path, mode="r")
+            varset = {"name": "set", "indices": ["3", 5, "1"]}
+            marker = Marker.from_any(adata_group, varset)
+            assert marker.isSet
+            assert marker.matrix_index == [3, 5, 1]
+            assert marker.index == ["3", "5", "1"]
+            assert np.allclose(marker.get_X_at([0, 2]), adata.X[[0, 2]][:, [3, 5, 1]].T)
+            assert np.allclose(marker.X, adata.X[:, [3, 5, 1]].mean(axis=1))
+            with pytest.raises(InvalidVar):
+                Marker.from_any(adata_group, {"name": "set", "indices": ["3", "x"]})
+
+    def test_open_anndata_zarr(self, anndata_zarr_v2, anndata_zarr_v3):
+        from cherita.utils.adata_utils import open_anndata_zarr
+
+        for zarr_path in [anndata_zarr_v2, anndata_zarr_v3]:
+            adata_group = open_anndata_zarr(str(zarr_path))
+            assert adata_group["obs"].attrs["_index"] == "_index"
+            assert open_anndata_zarr(str(zarr_path)) is adata_group
+
+    def test_open_anndata_zarr_ttl(self, anndata_zarr_v3, monkeypatch):
+        from cherita.utils import adata_utils
+
+        monkeypatch.setattr(adata_utils.Config, "ZARR_STORE_CACHE_TTL", 60)
+        # cache chunks as is done for remote stores
+        get_store = adata_utils.get_store
+        monkeypatch.setattr(
+            adata_utils,
+            "get_store",
+            lambda url: adata_utils.ChunkCacheStore(
+                get_store(url), cache_store=adata_utils.MemoryStore()
+            ),
+        )
+        adata_utils.clear_caches()
+        url = str(anndata_zarr_v3)
+
+        monkeypatch.setattr(adata_utils.time, "monotonic", lambda: 100.0)
+        adata_group = adata_utils.open_anndata_zarr(url)
+        adata_utils.parse_data(adata_group["obs"]["float"])
+        adata_utils.get_lookup_index(adata_group["var"]["_index"])
+        monkeypatch.setattr(adata_utils.time, "monotonic", lambda: 160.0)
+        assert adata_utils.open_anndata_zarr(url) is adata_group
+
+        # expired after the TTL from when it was opened
+        monkeypatch.setattr(adata_utils.time, "monotonic", lambda: 161.0)
+        new_group = adata_utils.open_anndata_zarr(url)
+        assert new_group is not adata_group
+        monkeypatch.setattr(adata_utils.time, "monotonic", lambda: 220.0)
+        assert adata_utils.open_anndata_zarr(url) is new_group
+
+        # the old group, its chunk cache and parsed data are released
+        store = weakref.ref(adata_group.store)
+        del adata_group
+        gc.collect()
+        assert store() is None
+
+    def test_parse_data_cached(self, anndata_zarr_v2, anndata_zarr_v3):
+        from cherita.utils.adata_utils import (
+            clear_caches,
+            open_anndata_zarr,
+            parse_data,
+        )
+
+        for zarr_path in [anndata_zarr_v2, anndata_zarr_v3]:
+            adata_group = open_anndata_zarr(str(zarr_path))
+            for name in ["float", "categorical"]:
+                column = parse_data(adata_group["obs"][name])
+                assert parse_data(adata_group["obs"][name]) is column
+            column = parse_data(adata_group["obs"]["float"])
+            clear_caches()
+            assert parse_data(adata_group["obs"]["float"]) is not column
+
+    def test_get_lookup_index(self, adata, anndata_zarr_v2, anndata_zarr_v3):
+        from cherita.utils.adata_utils import (
+            get_index_in_array,
+            get_lookup_index,
+            open_anndata_zarr,
+        )
+
+        for zarr_path in [anndata_zarr_v2, anndata_zarr_v3]:
+            var_index = open_anndata_zarr(str(zarr_path))["var"]["_index"]
+            index = get_lookup_index(var_index)
+            assert get_lookup_index(var_index) is index
+            assert get_index_in_array(var_index, adata.var_names[3]) == 3
+
+    def test_parse_group_columns(self, adata, anndata_zarr_v2, anndata_zarr_v3):
+        from cherita.utils.adata_utils import parse_group_columns
+
+        for zarr_path in [anndata_zarr_v2, anndata_zarr_v3]:
+            adata_group = zarr.open_group(zarr_path, mode="r")
+            names = ["float", "categorical", "integer"]
+            columns = parse_group_columns(adata_group["obs"], names)
+            assert list(columns) == names
+            for name in names:
+                assert np.array_equal(
+                    np.asarray(columns[name]), adata.obs[name].to_numpy()
+                )
+            # parsed columns are cached for subsequent requests
+            cached = parse_group_columns(adata_group["obs"], names)
+            assert cached["float"] is columns["float"]
+
+    def test_obs_cols_key_order(self, tmp_path):
+        from cherita import create_app
+
+        levels = ["low", "mid", "high"]
+        obs = pd.DataFrame(
+            {
+                "level": pd.Categorical(
+                    ["high", "low", "mid", "low"], categories=levels, ordered=True
+                )
+            },
+            index=[f"cell{i}" for i in range(4)],
+        )
+        adata = ad.AnnData(np.zeros((4, 1)), obs=obs)
+        adata.write_zarr(tmp_path / "anndata.zarr")
+
+        app = create_app({"TESTING": True})
+        response = app.test_client().post(
+            app.config["API_PREFIX"] + "/obs/cols",
+            json={"url": str(tmp_path / "anndata.zarr"), "cols": ["level"]},
+        )
+        (metadata,) = response.get_json()
+        # streamed in category order rather than with sorted keys
+        assert list(metadata["codes"]) == levels
+        assert list(metadata["value_counts"]) == levels
+
+    def test_plot_batch(self, anndata_zarr_v3):
+        from cherita import create_app
+
+        app = create_app({"TESTING": True})
+        client = app.test_client()
+        path = app.config["API_PREFIX"] + "/plot/batch"
+        shared = {
+            "url": str(anndata_zarr_v3),
+            "varKeys": ["0", "1"],
+            "obsCol": {"name": "categorical", "type": "categorical"},
+        }
+
+        response = client.post(
+            path,
+            json={
+                **shared,
+                "plots": [
+                    {"type": "heatmap"},
+                    {"type": "dotplot", "id": "dotplot_cat0", "obsValues": ["cat0"]},
+                    {"type": "dotplot", "varKeys": ["2"]},
+                    {"type": "matrixplot"},
+                ],
+            },
+        )
+        assert response.status_code == 200
+        results = response.get_json()
+        assert set(results) == {"heatmap", "dotplot", "dotplot_cat0", "matrixplot"}
+        # shared parameters can be overridden per plot
+        expected = {
+            key: client.post(
+                app.config["API_PREFIX"] + "/" + endpoint, json={**shared, **params}
+            ).get_json()
+            for key, endpoint, params in [
+                ("heatmap", "heatmap", {}),
+                ("dotplot_cat0", "dotplot", {"obsValues": ["cat0"]}),
+                ("dotplot", "dotplot", {"varKeys": ["2"]}),
+            ]
+        }
+        for key, plot in expected.items():
+            assert results[key] == plot
+
+        # plots of the same type need a unique id
+        response = client.post(
+            path, json={**shared, "plots": [{"type": "heatmap"}, {"type": "heatmap"}]}
+        )
+        assert response.status_code == 400
+        for plots in [
+            "heatmap",
+            [{"type": "heatmap"}, "dotplot"],
+            [{"type": "heatmap", "id": ["a"]}],
+            [{"type": "heatmap", "id": {"a": 1}}],
+            [{"type": ["heatmap"]}],
+        ]:
+            response = client.post(path, json={**shared, "plots": plots})
+            assert response.status_code == 400
+        response = client.post(path, json={**shared, "plots": [{"type": "pie"}]})
+        assert response.status_code == 400
@@ -0,0 +1,18 @@
+import base64
+
+import numpy as np
+import pytest
+
+from cherita.resources.errors import BadRequest
+from cherita.utils.request_utils import decode_obs_indices
+
+
+def test_decode_obs_indices():
+    indices = [0, 3, 70000]
+    buffer = np.array(indices, dtype="<i4").tobytes()
+    json_data = {"url": "x", "obsIndicesB64": base64.b64encode(buffer).decode()}
+    decoded = decode_obs_indices(json_data)
+    assert decoded["obsIndices"].tolist() == indices
+    assert decode_obs_indices({"obsIndices": indices}) == {"obsIndices": indices}
+    with pytest.raises(BadRequest):
+        decode_obs_indices({"obsIndicesB64": "AAA"})